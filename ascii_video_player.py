@@ -6,15 +6,43 @@ Plays videos as colored ASCII characters + small original preview
 import cv2
 import numpy as np
 import pygame
+import os
+import queue
 import sys
+import threading
 from typing import Tuple, Optional
 
+# Numba is optional - without it the NumPy lookup table path is used
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # ASCII characters from dark to bright - optimized scale
 ASCII_CHARS = " .':!*oe&#%@"
 # Alternative character set with more gradations
 ASCII_CHARS_EXTENDED = " .'`^\",:;Il!i><~+_-?][}{1)(|\\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$"
 
 
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _frame_kernel(gray, bgr, char_lut, out_idx, out_rgb):
+        """Fused pass: gray -> character index, BGR -> RGB (parallel over rows)"""
+        for i in prange(gray.shape[0]):
+            for j in range(gray.shape[1]):
+                out_idx[i, j] = char_lut[gray[i, j]]
+                out_rgb[i, j, 0] = bgr[i, j, 2]
+                out_rgb[i, j, 1] = bgr[i, j, 1]
+                out_rgb[i, j, 2] = bgr[i, j, 0]
+
+    # Warm up (compile or load from cache) at import, not on the first frame
+    _frame_kernel(np.zeros((1, 1), np.uint8), np.zeros((1, 1, 3), np.uint8),
+                  np.zeros(256, np.uint8), np.zeros((1, 1), np.uint8),
+                  np.zeros((1, 1, 3), np.uint8))
+else:
+    _frame_kernel = None
+
+
 class ASCIIVideoPlayer:
     """Video player with ASCII characters"""
     
@@ -36,6 +64,23 @@ class ASCIIVideoPlayer:
         self.chars = ASCII_CHARS_EXTENDED if use_extended_chars else ASCII_CHARS
         self.show_preview = show_preview
         
+        # Brightness -> character index lookup table (non-linear, square root)
+        # Precomputed once so every frame is a single NumPy gather
+        n_chars = len(self.chars)
+        self._char_lut = np.clip(
+            (np.sqrt(np.arange(256) / 255.0) * (n_chars - 1)).astype(np.int64),
+            0, n_chars - 1
+        ).astype(np.uint8)
+        # Histogram equalization is recomputed every N frames and reused in between,
+        # folded into the character lookup table (gray -> equalized -> character index)
+        self.equalize_interval = 4
+        self._frame_lut = self._char_lut
+        self._frames_since_equalize = self.equalize_interval
+        
+        # OpenCV: SIMD-optimized kernels, leave half the cores for decoding/rendering
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // 2))
+        
         # Load video
         self.cap = cv2.VideoCapture(video_path)
         if not self.cap.isOpened():
@@ -70,15 +115,29 @@ class ASCIIVideoPlayer:
         # ASCII area size - EXACT calculation
         # Use 'W' width as reference
         test_char = 'W'
-        char_width = self.font.size(test_char)[0]
-        char_height = self.font.get_height()
-        self.ascii_screen_width = self.ascii_width * char_width
-        self.ascii_screen_height = self.ascii_height * char_height
+        # Cached - font metrics are constant, no SDL_ttf queries per frame
+        self._char_w = self.font.size(test_char)[0]
+        self._char_h = self.font.get_height()
+        self.ascii_screen_width = self.ascii_width * self._char_w
+        self.ascii_screen_height = self.ascii_height * self._char_h
         
         # Preview size (bottom-right corner) - smaller so it doesn't cover too much
         self.preview_width = 240
         self.preview_height = int(self.preview_width * self.original_height / self.original_width)
         
+        # GPU decoding (NVDEC) when OpenCV is built with CUDA, otherwise self.cap is used
+        # GPU frames are shrunk in VRAM so only a small image is downloaded per frame
+        self.gpu_reader = self._open_gpu_reader()
+        self.gpu_frame_size = (max(self.ascii_width, self.preview_width),
+                               max(self.ascii_height, self.preview_height))
+        self.current_frame = 0
+        
+        # Background decoding - the next frames are read while the current one is rendered
+        self._frames = queue.Queue(maxsize=3)
+        self._decoder = None
+        # Bumped on restart - the decoder rewinds and queued frames of older generations are dropped
+        self._generation = 0
+        
         # Total window size - exactly ASCII content size
         # No extra space, window is exactly ASCII size + small margin
         self.screen_width = self.ascii_screen_width + 20
@@ -88,96 +147,259 @@ class ASCIIVideoPlayer:
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
         pygame.display.set_caption("ASCII Video Player")
         
+        # Output buffers reused by the fused frame kernel
+        self._idx_buf = np.empty((self.ascii_height, self.ascii_width), dtype=np.uint8)
+        self._rgb_buf = np.empty((self.ascii_height, self.ascii_width, 3), dtype=np.uint8)
+        
+        # Glyph atlas - every character rendered once into a fixed-size cell,
+        # stacked row-major as (n_chars, char_height, char_width, 3) RGB
+        # Aliased rendering: crisper at 10px and the white glyphs stay pure 0/255 masks,
+        # so tinting by multiplication reproduces the exact cell color
+        cells = []
+        for i, c in enumerate(self.chars):
+            if use_color:
+                color = (255, 255, 255)
+            else:
+                # Grayscale mode: bake each character's fixed gray level into the atlas
+                gray_val = int((i / len(self.chars)) * 255)
+                color = (gray_val, gray_val, gray_val)
+            cell = pygame.Surface((self._char_w, self._char_h))
+            cell.blit(self.font.render(c, False, color, (0, 0, 0)), (0, 0))
+            cells.append(pygame.surfarray.array3d(cell).transpose(1, 0, 2))
+        self.atlas = np.stack(cells)
+        # Color mode: tinted cells cached per (character, 3-bit RGB) key - colors are
+        # quantized to 3 bits/channel in frame_to_ascii
+        # key = (char_index << 9) | (r3 << 6) | (g3 << 3) | b3 -> slot in self._tile_cache
+        self._tile_cache = np.empty((min(len(self.chars) << 9,
+                                         max(8192, self.ascii_width * self.ascii_height)),)
+                                    + self.atlas.shape[1:], dtype=np.uint8)
+        self._tile_slot = np.full(len(self.chars) << 9, -1, dtype=np.int32)
+        self._tile_count = 0
+        # Row-major RGB canvas the ASCII frame is composed into; the offscreen surface
+        # wraps its buffer directly, so each frame is drawn without any upload call
+        self._canvas = np.zeros((self.ascii_screen_height, self.ascii_screen_width, 3), dtype=np.uint8)
+        self._canvas_cells = self._canvas.reshape(self.ascii_height, self._char_h,
+                                                  self.ascii_width, self._char_w, 3)
+        self.ascii_surface = pygame.image.frombuffer(
+            self._canvas.data, (self.ascii_screen_width, self.ascii_screen_height), 'RGB')
+        # Inputs of the frame currently on self.ascii_surface (unchanged frames are not redrawn)
+        self._last_char_index = None
+        self._last_color_array = None
+        
+        # Semi-transparent backgrounds for the status line and preview - allocated once
+        # Sized for at least 6 digits - CAP_PROP_FRAME_COUNT can be an estimate, 0 or -1
+        max_count = "9" * max(6, len(str(self.frame_count)))
+        info_width = self.font.size(f"Frame: {max_count}/{max_count}")[0]
+        self._info_bg = pygame.Surface((info_width + 10, self._char_h + 6))
+        self._info_bg.fill((0, 0, 0))
+        self._info_bg.set_alpha(200)
+        self._preview_bg = pygame.Surface((self.preview_width + 4, self.preview_height + 4))
+        self._preview_bg.fill((0, 0, 0))
+        self._preview_bg.set_alpha(200)
+        
         self.clock = pygame.time.Clock()
         self.running = False
         
-    def frame_to_ascii(self, frame: np.ndarray) -> Tuple[str, Optional[np.ndarray]]:
+    def _open_gpu_reader(self):
+        """CUDA video reader, or None if CUDA decoding is unavailable"""
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                return None
+            return cv2.cudacodec.createVideoReader(self.video_path)
+        except (AttributeError, cv2.error):
+            return None
+    
+    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
         """
-        Convert frame to ASCII characters
+        Read next BGR frame (already downscaled when decoded on the GPU)
         
         Returns:
-            (ascii_string, color_array): ASCII text and optional color array
+            (ret, frame): success flag and frame
         """
-        # Resize - directly to target resolution
-        resized = cv2.resize(frame, (self.ascii_width, self.ascii_height))
+        if self.gpu_reader is None:
+            ret, frame = self.cap.read()
+        else:
+            ret, gpu_frame = self.gpu_reader.nextFrame()
+            frame = None
+            if ret:
+                gpu_frame = cv2.cuda.resize(gpu_frame, self.gpu_frame_size,
+                                            interpolation=cv2.INTER_AREA)
+                frame = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGRA2BGR).download()
         
-        # Convert to grayscale for character selection
-        gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+        if ret:
+            self.current_frame += 1
+        return ret, frame
+    
+    def rewind(self):
+        """Jump back to the first frame"""
+        if self.gpu_reader is None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        else:
+            # cudacodec readers cannot seek - reopen the video
+            self.gpu_reader = cv2.cudacodec.createVideoReader(self.video_path)
+        self.current_frame = 0
+    
+    def _decode_loop(self):
+        """Decoder thread: read frames ahead into self._frames"""
+        generation = self._generation
+        while self.running:
+            try:
+                if generation != self._generation:
+                    generation = self._generation
+                    self.rewind()
+                
+                ret, frame = self.read_frame()
+                if not ret:
+                    # End of video - restart
+                    self.rewind()
+            except Exception as e:
+                # Hand the error to the main loop, which re-raises it
+                self._queue_frame(e)
+                return
+            
+            self._queue_frame((generation, ret, frame, self.current_frame))
+    
+    def _queue_frame(self, item):
+        """Put item into self._frames, giving up when playback stops"""
+        while self.running:
+            try:
+                self._frames.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+    
+    @staticmethod
+    def _equalize_lut(gray: np.ndarray) -> np.ndarray:
+        """Histogram equalization lookup table (same mapping as cv2.equalizeHist)"""
+        hist = np.bincount(gray.ravel(), minlength=256)
+        first = np.flatnonzero(hist)[0]
+        if hist[first] == gray.size:
+            # Single gray level
+            return np.full(256, first, dtype=np.uint8)
+        # float32 like OpenCV, so rounding matches exactly
+        scale = np.float32(255.0 / (gray.size - hist[first]))
+        cdf = (np.cumsum(hist) - hist[first]).astype(np.float32)
+        return np.clip(np.rint(cdf * scale), 0, 255).astype(np.uint8)
+    
+    def frame_to_ascii(self, frame: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Convert frame to ASCII characters
+        
+        Returns:
+            (char_index, color_array): character index grid (into self.chars)
+                                       and optional RGB color array
+        """
+        resized = None
+        if self.use_color:
+            # Resize - directly to target resolution (area averaging for heavy downscale)
+            resized = cv2.resize(frame, (self.ascii_width, self.ascii_height),
+                                 interpolation=cv2.INTER_AREA)
+            
+            # Convert to grayscale for character selection
+            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+        else:
+            # Grayscale only - convert first, the single-channel area resize is cheaper
+            gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+                              (self.ascii_width, self.ascii_height),
+                              interpolation=cv2.INTER_AREA)
         
-        # Increase contrast (histogram equalization)
-        gray = cv2.equalizeHist(gray)
+        # Increase contrast (histogram equalization) - refresh the equalization table
+        # periodically, the scene's histogram changes slowly between frames
+        if self._frames_since_equalize >= self.equalize_interval:
+            self._frame_lut = self._char_lut[self._equalize_lut(gray)]
+            self._frames_since_equalize = 0
+        self._frames_since_equalize += 1
         
-        # Convert to characters
-        ascii_frame = ""
         color_array = None
         
-        if self.use_color:
-            color_array = resized.copy()
-        
-        for row in gray:
-            for pixel_value in row:
-                # Pixel value -> character index (improved mapping)
-                # 0-255 range -> character index, non-linear
-                normalized = pixel_value / 255.0
-                char_index = int(normalized ** 0.5 * (len(self.chars) - 1))
-                char_index = min(max(char_index, 0), len(self.chars) - 1)
-                ascii_frame += self.chars[char_index]
-            ascii_frame += "\n"
-        
-        return ascii_frame, color_array
+        if not self.use_color:
+            # Pixel value -> character index via lookup table
+            char_index = self._frame_lut[gray]
+        elif _frame_kernel is not None:
+            # Pixel value -> character index and BGR -> RGB in one parallel pass
+            _frame_kernel(gray, resized, self._frame_lut, self._idx_buf, self._rgb_buf)
+            char_index = self._idx_buf
+            color_array = self._rgb_buf
+        else:
+            char_index = self._frame_lut[gray]
+            color_array = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        
+        if color_array is not None:
+            # Quantize to 3 bits/channel (bucket centers) - 512 colors keep the
+            # tinted cell cache small and hot, and suit the ASCII art look
+            np.bitwise_and(color_array, 0xE0, out=color_array)
+            np.bitwise_or(color_array, 0x10, out=color_array)
+        
+        return char_index, color_array
     
-    def draw_ascii_frame(self, ascii_text: str, color_array: Optional[np.ndarray] = None):
-        """Draw ASCII frame on screen"""
-        y = 10
-        lines = ascii_text.split('\n')
-        
-        # Monospace character width
-        char_width = self.font.size('W')[0]
-        char_height = self.font.get_height()
-        
-        for row_idx, line in enumerate(lines):
-            if not line:
-                continue
-                
-            x = 10
-            for col_idx, char in enumerate(line):
-                if self.use_color and color_array is not None:
-                    # BGR -> RGB
-                    b, g, r = color_array[row_idx, col_idx]
-                    color = (int(r), int(g), int(b))
-                else:
-                    # Grayscale
-                    gray_val = int((self.chars.index(char) / len(self.chars)) * 255)
-                    color = (gray_val, gray_val, gray_val)
-                
-                text_surface = self.font.render(char, True, color)
-                self.screen.blit(text_surface, (x, y))
-                # FIXED width for every character!
-                x += char_width
+    def _tile_slots(self, char_index: np.ndarray, color_array: np.ndarray) -> np.ndarray:
+        """Cache slots of the tinted cells for every grid position (missing ones are added)"""
+        rgb3 = (color_array >> 5).astype(np.int32)
+        keys = ((char_index.astype(np.int32) << 9)
+                | (rgb3[:, :, 0] << 6) | (rgb3[:, :, 1] << 3) | rgb3[:, :, 2])
+        slots = self._tile_slot[keys]
+        
+        missing = slots < 0
+        if missing.any():
+            new_keys = np.unique(keys[missing])
+            if self._tile_count + len(new_keys) > len(self._tile_cache):
+                # Cache full - start over with the keys of this frame
+                self._tile_slot.fill(-1)
+                self._tile_count = 0
+                new_keys = np.unique(keys)
             
-            y += char_height
+            # Multiply white glyphs by the quantized color (3-bit bucket -> bucket center,
+            # the exact value frame_to_ascii produced)
+            colors = (np.stack([(new_keys >> 6) & 7, (new_keys >> 3) & 7, new_keys & 7],
+                               axis=1) << 5) | 0x10
+            new_slots = np.arange(self._tile_count, self._tile_count + len(new_keys))
+            self._tile_cache[new_slots] = (self.atlas[new_keys >> 9]
+                                           * colors[:, None, None, :].astype(np.uint16) // 255)
+            self._tile_slot[new_keys] = new_slots
+            self._tile_count += len(new_keys)
+            slots = self._tile_slot[keys]
+        
+        return slots
+    
+    def draw_ascii_frame(self, char_index: np.ndarray, color_array: Optional[np.ndarray] = None):
+        """Draw ASCII frame (character index grid) on screen"""
+        # Unchanged frame (static scene) - reuse the last rendered canvas
+        if (self._last_char_index is not None
+                and np.array_equal(char_index, self._last_char_index)
+                and (color_array is None or np.array_equal(color_array, self._last_color_array))):
+            self.screen.blit(self.ascii_surface, (10, 10))
+            return
+        # Copies - the kernel output buffers are overwritten by the next frame
+        self._last_char_index = char_index.copy()
+        self._last_color_array = None if color_array is None else color_array.copy()
+        
+        # Gather glyph cells: (rows, cols, char_height, char_width, 3)
+        if self.use_color and color_array is not None:
+            tiles = self._tile_cache[self._tile_slots(char_index, color_array)]
+        else:
+            tiles = self.atlas[char_index]
+        
+        # Stitch cells into the canvas behind self.ascii_surface and blit it once
+        self._canvas_cells[...] = tiles.transpose(0, 2, 1, 3, 4)
+        self.screen.blit(self.ascii_surface, (10, 10))
     
     def draw_preview(self, frame: np.ndarray):
         """Original video small preview in bottom-right corner"""
         # Resize
-        preview = cv2.resize(frame, (self.preview_width, self.preview_height))
-        
-        # BGR -> RGB
-        preview = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+        preview = cv2.resize(frame, (self.preview_width, self.preview_height),
+                             interpolation=cv2.INTER_AREA)
         
-        # NumPy array -> Pygame surface
-        preview = np.transpose(preview, (1, 0, 2))
-        preview_surface = pygame.surfarray.make_surface(preview)
+        # NumPy array -> Pygame surface, reading the native BGR buffer directly
+        preview = np.ascontiguousarray(preview)
+        preview_surface = pygame.image.frombuffer(
+            preview.data, (self.preview_width, self.preview_height), 'BGR')
         
         # Bottom-right corner position - 15px margin within ASCII area
         x = self.screen_width - self.preview_width - 15
         y = self.screen_height - self.preview_height - 15
         
         # Semi-transparent background under preview (black)
-        bg_surface = pygame.Surface((self.preview_width + 4, self.preview_height + 4))
-        bg_surface.fill((0, 0, 0))
-        bg_surface.set_alpha(200)
-        self.screen.blit(bg_surface, (x - 2, y - 2))
+        self.screen.blit(self._preview_bg, (x - 2, y - 2))
         
         # Frame around preview
         pygame.draw.rect(self.screen, (255, 255, 255), 
@@ -204,6 +426,9 @@ class ASCIIVideoPlayer:
         
         paused = False
         
+        self._decoder = threading.Thread(target=self._decode_loop, daemon=True)
+        self._decoder.start()
+        
         while self.running:
             # Handle events
             for event in pygame.event.get():
@@ -215,8 +440,8 @@ class ASCIIVideoPlayer:
                     elif event.key == pygame.K_SPACE:
                         paused = not paused
                     elif event.key == pygame.K_r:
-                        # Restart
-                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        # Restart - handled by the decoder thread
+                        self._generation += 1
                         paused = False
                     elif event.key == pygame.K_p:
                         # Toggle preview on/off
@@ -224,39 +449,41 @@ class ASCIIVideoPlayer:
                         print(f"Preview: {'ON' if self.show_preview else 'OFF'}")
             
             if not paused:
-                # Read frame
-                ret, frame = self.cap.read()
+                # Read frame (decoded ahead by the decoder thread)
+                try:
+                    item = self._frames.get(timeout=0.1)
+                except queue.Empty:
+                    continue
                 
-                if not ret:
-                    # End of video - restart
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                if isinstance(item, Exception):
+                    # Decoder thread failed
+                    raise item
+                generation, ret, frame, frame_number = item
+                
+                if generation != self._generation or not ret:
+                    # Stale frame from before a restart, or end of video (decoder restarts)
                     continue
                 
                 # Clear background
                 self.screen.fill((0, 0, 0))
                 
                 # ASCII conversion
-                ascii_text, color_array = self.frame_to_ascii(frame)
+                char_index, color_array = self.frame_to_ascii(frame)
                 
                 # Draw ASCII
-                self.draw_ascii_frame(ascii_text, color_array)
+                self.draw_ascii_frame(char_index, color_array)
                 
                 # Draw preview - only if enabled
                 if self.show_preview:
                     self.draw_preview(frame)
                 
                 # Status info - bottom-left corner
-                current_frame = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-                info_text = f"Frame: {current_frame}/{self.frame_count}"
+                info_text = f"Frame: {frame_number}/{self.frame_count}"
                 
                 # Black background behind text
                 info_surface = self.font.render(info_text, True, (200, 200, 200))
-                text_width, text_height = self.font.size(info_text)
-                bg_rect = pygame.Surface((text_width + 10, text_height + 6))
-                bg_rect.fill((0, 0, 0))
-                bg_rect.set_alpha(200)
-                self.screen.blit(bg_rect, (8, self.screen_height - text_height - 12))
-                self.screen.blit(info_surface, (10, self.screen_height - text_height - 10))
+                self.screen.blit(self._info_bg, (8, self.screen_height - self._char_h - 12))
+                self.screen.blit(info_surface, (10, self.screen_height - self._char_h - 10))
                 
                 # Update screen
                 pygame.display.flip()
@@ -278,6 +505,9 @@ class ASCIIVideoPlayer:
     
     def cleanup(self):
         """Release resources"""
+        self.running = False
+        if self._decoder is not None:
+            self._decoder.join(timeout=1.0)
         self.cap.release()
         pygame.quit()
         print("\nPlayback finished.")
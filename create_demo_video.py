@@ -24,18 +24,27 @@ def create_demo_video(output_path: str, duration: int = 5, fps: int = 30):
     print(f"Creating demo video: {output_path}")
     print(f"Size: {width}x{height}, FPS: {fps}, Duration: {duration}s")
     
+    # Background gradient - same for every frame, computed once
+    gradient = np.zeros((height, width, 3), dtype=np.uint8)
+    color_vals = (255 * np.arange(height) // height).astype(np.uint8)
+    gradient[:, :, 0] = (color_vals // 3)[:, None]
+    gradient[:, :, 1] = (color_vals // 2)[:, None]
+    gradient[:, :, 2] = color_vals[:, None]
+    
+    # Circle positions and stripe offsets for all frames at once
+    frame_nums = np.arange(total_frames)
+    circle_x = (width * (0.5 + 0.3 * np.sin(2 * np.pi * frame_nums / fps))).astype(int)
+    circle_y = (height * (0.5 + 0.3 * np.cos(2 * np.pi * frame_nums / fps))).astype(int)
+    stripe_offsets = (30 * np.sin(2 * np.pi * (frame_nums[:, None] / fps
+                                               + np.arange(6) * 0.2))).astype(int)
+    
     for frame_num in range(total_frames):
-        # Empty frame
-        frame = np.zeros((height, width, 3), dtype=np.uint8)
-        
         # Background gradient
-        for y in range(height):
-            color_val = int(255 * y / height)
-            frame[y, :] = [color_val // 3, color_val // 2, color_val]
+        frame = gradient.copy()
         
         # Moving circle
-        center_x = int(width * (0.5 + 0.3 * np.sin(2 * np.pi * frame_num / fps)))
-        center_y = int(height * (0.5 + 0.3 * np.cos(2 * np.pi * frame_num / fps)))
+        center_x = int(circle_x[frame_num])
+        center_y = int(circle_y[frame_num])
         radius = 50
         cv2.circle(frame, (center_x, center_y), radius, (0, 255, 255), -1)
         cv2.circle(frame, (center_x, center_y), radius, (255, 255, 255), 3)
@@ -64,7 +73,7 @@ def create_demo_video(output_path: str, duration: int = 5, fps: int = 30):
         
         for i, color in enumerate(colors):
             y_start = height // 2 + i * stripe_height
-            offset = int(30 * np.sin(2 * np.pi * (frame_num / fps + i * 0.2)))
+            offset = int(stripe_offsets[frame_num, i])
             cv2.rectangle(frame, (offset, y_start), 
                          (width - offset, y_start + stripe_height - 2), 
                          color, -1)